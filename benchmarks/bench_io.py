@@ -0,0 +1,493 @@
+"""
+本地I/O热点路径基准测试（完全离线运行）
+
+使用faker生成不同规模（默认1k/100k/1M条发布记录）的合成历史数据，
+分别测量统计、配置、账号、日志和图片下载等文件处理路径的吞吐量、
+延迟分位数和峰值内存，结果以JSON输出，便于不同运行之间对比。
+
+用法:
+    python benchmarks/bench_io.py
+    python benchmarks/bench_io.py --sizes 1000,100000 --repeat 20 --output bench.json
+    python benchmarks/bench_io.py --baseline old_bench.json
+"""
+import argparse
+import contextlib
+import gc
+import importlib
+import io
+import json
+import math
+import os
+import platform as py_platform
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from faker import Faker
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PLATFORMS = ["instagram", "facebook", "twitter", "vk", "tiktok", "reddit", "okru"]
+STATUSES = ["success", "success", "success", "failed", "error"]
+
+# 本地替身服务器返回的图片大小（字节）
+IMAGE_PAYLOAD_SIZE = 256 * 1024
+
+# 基准测试用例注册表: 名称 -> 准备函数(sma, ctx) -> 单次操作函数(i)
+BENCH_CASES = {}
+
+
+def bench_case(name):
+    """注册基准测试用例"""
+    def decorator(func):
+        BENCH_CASES[name] = func
+        return func
+    return decorator
+
+
+# ==== 合成数据生成 ====
+
+def build_pools(size, fake):
+    """按数据规模生成用户名和主题池"""
+    user_count = max(10, min(size // 50, 20000))
+    topic_count = max(5, min(size // 200, 500))
+
+    usernames = set()
+    while len(usernames) < user_count:
+        usernames.add(fake.unique.user_name())
+    topics = set()
+    while len(topics) < topic_count:
+        topics.add(fake.word())
+    fake.unique.clear()
+    return sorted(usernames), sorted(topics)
+
+
+def generate_history(size, usernames, topics, rng, history_file=None):
+    """
+    生成与record_post_stats结构一致的统计数据
+    size: 发布记录条数
+    history_file: 如提供，同时写入逐条发布记录（JSON Lines，时间跨度3年）
+    返回: 统计字典
+    """
+    stats = {
+        "global": {"total": 0, "success": 0, "failed": 0, "platforms": {}, "topics": {}}
+    }
+    global_stats = stats["global"]
+    base_time = datetime.now() - timedelta(days=3 * 365)
+    step = (3 * 365 * 24 * 3600) / max(size, 1)
+
+    for i in range(size):
+        platform = rng.choice(PLATFORMS)
+        username = rng.choice(usernames)
+        topic = rng.choice(topics)
+        status = rng.choice(STATUSES)
+
+        if history_file:
+            timestamp = (base_time + timedelta(seconds=int(i * step))).strftime("%Y-%m-%d %H:%M:%S")
+            history_file.write(json.dumps({
+                "timestamp": timestamp, "platform": platform, "username": username,
+                "topic": topic, "status": status
+            }, ensure_ascii=False) + "\n")
+
+        user_stats = stats.setdefault(platform, {}).setdefault(
+            username, {"total": 0, "success": 0, "failed": 0, "topics": {}}
+        )
+        user_stats["total"] += 1
+        global_stats["total"] += 1
+        if status == "success":
+            user_stats["success"] += 1
+            global_stats["success"] += 1
+        else:
+            user_stats["failed"] += 1
+            global_stats["failed"] += 1
+        user_stats["topics"][topic] = user_stats["topics"].get(topic, 0) + 1
+        global_stats["platforms"][platform] = global_stats["platforms"].get(platform, 0) + 1
+        global_stats["topics"][topic] = global_stats["topics"].get(topic, 0) + 1
+
+    stats["last_updated"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return stats
+
+
+def generate_config(usernames, topics, rng):
+    """生成包含合成账号的配置"""
+    accounts = {platform: [] for platform in PLATFORMS}
+    base_time = datetime.now() - timedelta(days=365)
+    for username in usernames:
+        last_posted = base_time + timedelta(minutes=rng.randint(0, 365 * 24 * 60))
+        accounts[rng.choice(PLATFORMS)].append({
+            "username": username,
+            "password": f"pw_{rng.getrandbits(32):08x}",
+            "last_posted": last_posted.strftime("%Y-%m-%d %H:%M:%S")
+        })
+    return {
+        "accounts": accounts,
+        "topics": topics[:50],
+        "post_frequency": {platform: 24 for platform in PLATFORMS},
+        "proxy": ""
+    }
+
+
+def write_activity_log(path, size, usernames, topics, rng):
+    """生成与发布记录数量相同行数的历史活动日志"""
+    base_time = datetime.now() - timedelta(days=365)
+    step = max(1, (365 * 24 * 3600) // max(size, 1))
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(size):
+            timestamp = (base_time + timedelta(seconds=i * step)).strftime("%Y-%m-%d %H:%M:%S")
+            platform = rng.choice(PLATFORMS)
+            f.write(
+                f"[{timestamp}] [INFO] {platform}账号{rng.choice(usernames)}"
+                f"发布关于{rng.choice(topics)}的内容\n"
+            )
+
+
+def prepare_workspace(workdir, size, fake, rng):
+    """在临时目录中准备与程序运行目录相同的结构和数据"""
+    for name in ["credentials", "media", "logs", "stats"]:
+        os.makedirs(os.path.join(workdir, name), exist_ok=True)
+
+    usernames, topics = build_pools(size, fake)
+
+    with open(os.path.join(workdir, "stats", "post_history.jsonl"), "w", encoding="utf-8") as f:
+        stats = generate_history(size, usernames, topics, rng, f)
+    with open(os.path.join(workdir, "stats", "post_stats.json"), "w", encoding="utf-8") as f:
+        json.dump(stats, f, ensure_ascii=False, indent=2)
+
+    config = generate_config(usernames, topics, rng)
+    with open(os.path.join(workdir, "credentials", "config.json"), "w", encoding="utf-8") as f:
+        json.dump(config, f, ensure_ascii=False, indent=4)
+
+    write_activity_log(os.path.join(workdir, "logs", "activity.log"), size, usernames, topics, rng)
+
+    return {
+        "size": size,
+        "workdir": workdir,
+        "usernames": usernames,
+        "topics": topics,
+        "rng": rng,
+        "fake": fake
+    }
+
+
+# ==== 本地替身图片服务器 ====
+
+class ImageHandler(BaseHTTPRequestHandler):
+    payload = b""
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(self.payload)))
+        self.end_headers()
+        self.wfile.write(self.payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_image_server(payload_size=IMAGE_PAYLOAD_SIZE):
+    """启动本地图片服务器，返回(server, url模板)"""
+    ImageHandler.payload = b"\xff\xd8\xff\xe0" + os.urandom(payload_size - 6) + b"\xff\xd9"
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ImageHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/featured/?{{keyword}}"
+    return server, url
+
+
+# ==== 基准测试用例 ====
+
+@bench_case("record_post_stats")
+def case_record_post_stats(sma, ctx):
+    rng = ctx["rng"]
+
+    def run(i):
+        sma.record_post_stats(
+            rng.choice(PLATFORMS), rng.choice(ctx["usernames"]),
+            rng.choice(ctx["topics"]), rng.choice(STATUSES)
+        )
+    return run
+
+
+@bench_case("get_stats_summary")
+def case_get_stats_summary(sma, ctx):
+    def run(i):
+        sma.get_stats_summary()
+    return run
+
+
+@bench_case("load_config")
+def case_load_config(sma, ctx):
+    def run(i):
+        sma.load_config()
+    return run
+
+
+@bench_case("save_account")
+def case_save_account(sma, ctx):
+    rng = ctx["rng"]
+
+    def run(i):
+        # 一半更新已有账号，一半添加新账号
+        if i % 2 == 0:
+            username = rng.choice(ctx["usernames"])
+        else:
+            username = f"bench_user_{i}"
+        sma.save_account(rng.choice(PLATFORMS), username, f"pw_{i}")
+    return run
+
+
+@bench_case("log_activity")
+def case_log_activity(sma, ctx):
+    def run(i):
+        sma.log_activity(f"基准测试日志消息 #{i}")
+    return run
+
+
+@bench_case("download_image")
+def case_download_image(sma, ctx):
+    topics = ctx["topics"]
+
+    def run(i):
+        path = sma.download_image(topics[i % len(topics)])
+        if path is None:
+            raise RuntimeError("本地图片服务器下载失败")
+    return run
+
+
+@bench_case("export_post_history")
+def case_export_post_history(sma, ctx):
+    def run(i):
+        output_dir = os.path.join(ctx["workdir"], "exports", f"bench_{i}")
+        sma.export_post_history(output_dir)
+        shutil.rmtree(output_dir, ignore_errors=True)
+    return run
+
+
+@bench_case("metrics_render")
+def case_metrics_render(sma, ctx):
+    # 按平台和阶段填充指标，模拟长时间运行的调度器
+    registry = sma.MetricsRegistry()
+    rng = ctx["rng"]
+    stages = ["select_account", "download_image", "generate_caption", "browser_init", "login", "publish", "total"]
+    for _ in range(min(ctx["size"], 10000)):
+        platform = rng.choice(PLATFORMS)
+        registry.inc("hqmw_tasks_total", {"platform": platform})
+        registry.observe(
+            "hqmw_stage_duration_seconds", rng.uniform(0, 120),
+            {"platform": platform, "stage": rng.choice(stages)}
+        )
+
+    def run(i):
+        registry.render()
+    return run
+
+
+# ==== 测量与报告 ====
+
+def percentile(sorted_values, pct):
+    """最近秩法计算分位数"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def measure(run, repeat, memory_repeat):
+    """
+    分两轮测量：计时轮不启用tracemalloc以免干扰延迟，内存轮记录峰值内存
+    返回: 结果字典
+    """
+    sink = io.StringIO()
+    latencies = []
+    gc.collect()
+    with contextlib.redirect_stdout(sink):
+        wall_start = time.perf_counter()
+        for i in range(repeat):
+            start = time.perf_counter()
+            run(i)
+            latencies.append(time.perf_counter() - start)
+        wall_time = time.perf_counter() - wall_start
+
+        gc.collect()
+        tracemalloc.start()
+        try:
+            for i in range(repeat, repeat + memory_repeat):
+                run(i)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "ops": repeat,
+        "wall_time_sec": round(wall_time, 6),
+        "throughput_ops_per_sec": round(repeat / wall_time, 3) if wall_time > 0 else None,
+        "latency_ms": {
+            "min": round(latencies[0] * 1000, 4),
+            "p50": round(percentile(latencies, 50) * 1000, 4),
+            "p90": round(percentile(latencies, 90) * 1000, 4),
+            "p99": round(percentile(latencies, 99) * 1000, 4),
+            "max": round(latencies[-1] * 1000, 4),
+            "mean": round(sum(latencies) / len(latencies) * 1000, 4)
+        },
+        "peak_memory_bytes": peak
+    }
+
+
+def file_sizes(workdir):
+    """记录主要数据文件的大小"""
+    paths = {
+        "post_stats.json": os.path.join(workdir, "stats", "post_stats.json"),
+        "config.json": os.path.join(workdir, "credentials", "config.json"),
+        "post_history.jsonl": os.path.join(workdir, "stats", "post_history.jsonl"),
+        "activity.log": os.path.join(workdir, "logs", "activity.log")
+    }
+    return {name: os.path.getsize(path) for name, path in paths.items() if os.path.exists(path)}
+
+
+def compare_with_baseline(results, baseline_path):
+    """与之前的基准结果对比p50延迟和吞吐量"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    previous = {(r["size"], r["case"]): r for r in baseline.get("results", [])}
+
+    lines = []
+    for result in results:
+        old = previous.get((result["size"], result["case"]))
+        if not old or "latency_ms" not in old or "latency_ms" not in result:
+            continue
+        old_p50 = old["latency_ms"]["p50"]
+        new_p50 = result["latency_ms"]["p50"]
+        change = ((new_p50 - old_p50) / old_p50 * 100) if old_p50 else 0.0
+        lines.append(
+            f"{result['case']:<24} size={result['size']:<8} "
+            f"p50 {old_p50:.3f}ms -> {new_p50:.3f}ms ({change:+.1f}%)"
+        )
+    return lines
+
+
+def import_app(workdir):
+    """在临时目录中导入主程序，避免在仓库目录下创建数据文件"""
+    os.chdir(workdir)
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return importlib.import_module("social_media_auto")
+
+
+def run_benchmarks(sizes, cases, repeat, memory_repeat, seed):
+    results = []
+    original_cwd = os.getcwd()
+    root = tempfile.mkdtemp(prefix="hqmw_bench_")
+
+    # 本地请求不走代理，确保离线可用
+    os.environ["NO_PROXY"] = "127.0.0.1,localhost"
+    os.environ["no_proxy"] = "127.0.0.1,localhost"
+    server, image_url = start_image_server()
+
+    try:
+        sma = import_app(root)
+        sma.IMAGE_SOURCE_URL = image_url
+
+        for size in sizes:
+            workdir = os.path.join(root, f"size_{size}")
+            rng = random.Random(seed + size)
+            fake = Faker()
+            fake.seed_instance(seed + size)
+
+            gen_start = time.perf_counter()
+            ctx = prepare_workspace(workdir, size, fake, rng)
+            gen_time = time.perf_counter() - gen_start
+            print(f"[bench] size={size} 合成数据生成耗时 {gen_time:.2f}s", file=sys.stderr)
+
+            os.chdir(workdir)
+            sizes_before = file_sizes(workdir)
+            for name in cases:
+                result = {"size": size, "case": name}
+                try:
+                    result.update(measure(BENCH_CASES[name](sma, ctx), repeat, memory_repeat))
+                except Exception as e:
+                    result["error"] = str(e)
+                results.append(result)
+                summary = result.get("latency_ms", {}).get("p50", "-")
+                print(f"[bench] size={size} {name}: p50={summary}ms", file=sys.stderr)
+
+            results.append({
+                "size": size,
+                "case": "_dataset",
+                "generation_sec": round(gen_time, 3),
+                "file_sizes_bytes": sizes_before,
+                "usernames": len(ctx["usernames"]),
+                "topics": len(ctx["topics"])
+            })
+            os.chdir(root)
+            shutil.rmtree(workdir, ignore_errors=True)
+    finally:
+        server.shutdown()
+        os.chdir(original_cwd)
+        shutil.rmtree(root, ignore_errors=True)
+
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="本地I/O热点路径基准测试")
+    parser.add_argument("--sizes", default="1000,100000,1000000",
+                        help="合成历史的发布记录条数，逗号分隔")
+    parser.add_argument("--cases", default=",".join(BENCH_CASES),
+                        help=f"要运行的用例，逗号分隔（可选: {', '.join(BENCH_CASES)}）")
+    parser.add_argument("--repeat", type=int, default=50, help="每个用例的计时次数")
+    parser.add_argument("--memory-repeat", type=int, default=3, help="峰值内存测量轮的执行次数")
+    parser.add_argument("--seed", type=int, default=20240601, help="随机种子")
+    parser.add_argument("--output", help="结果JSON文件路径（默认输出到标准输出）")
+    parser.add_argument("--baseline", help="用于对比的历史结果JSON文件")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    cases = [c.strip() for c in args.cases.split(",") if c.strip()]
+    unknown = [c for c in cases if c not in BENCH_CASES]
+    if unknown:
+        parser.error(f"未知用例: {', '.join(unknown)}")
+    if args.repeat < 1:
+        parser.error("--repeat必须大于0")
+
+    results = run_benchmarks(sizes, cases, args.repeat, max(1, args.memory_repeat), args.seed)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "python": py_platform.python_version(),
+            "platform": py_platform.platform(),
+            "sizes": sizes,
+            "repeat": args.repeat,
+            "memory_repeat": args.memory_repeat,
+            "seed": args.seed
+        },
+        "results": results
+    }
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+        print(f"[bench] 结果已保存至: {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+    if args.baseline:
+        for line in compare_with_baseline(results, args.baseline):
+            print(f"[bench] {line}", file=sys.stderr)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
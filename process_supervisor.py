@@ -0,0 +1,139 @@
+"""
+进程监管工具：清理任务残留的子进程、采集进程资源使用情况
+
+只依赖psutil，不导入浏览器和界面相关模块，便于单独测试
+"""
+import threading
+
+import psutil
+
+
+class ProcessSupervisor:
+    """
+    跟踪一次任务期间启动的子进程（Chrome、chromedriver），任务结束时结束残留进程
+    任务期间由后台线程定期记录子进程，因此浏览器启动失败、chromedriver退出后
+    被重新挂到init的Chrome进程也能被清理
+    label: 任务名称（平台），传给on_reap
+    grace: 发送terminate后等待进程退出的秒数，超时则kill
+    poll_interval: 记录子进程的间隔（秒）
+    on_reap: 清理了残留进程时调用的函数 on_reap(label, names)，names为"名称(pid)"列表
+    """
+    def __init__(self, label, grace=5, poll_interval=0.2, on_reap=None):
+        self.label = label
+        self.grace = grace
+        self.poll_interval = poll_interval
+        self.on_reap = on_reap
+        self.process = psutil.Process()
+        self.baseline = set()
+        self.tracked = {}
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.poll_thread = None
+
+    def __enter__(self):
+        self.baseline = {child.pid for child in self._children()}
+        self.stop_event.clear()
+        self.poll_thread = threading.Thread(target=self._poll)
+        self.poll_thread.daemon = True
+        self.poll_thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop_event.set()
+        if self.poll_thread:
+            self.poll_thread.join()
+            self.poll_thread = None
+        self.reap()
+        return False
+
+    def _poll(self):
+        while not self.stop_event.is_set():
+            self.track()
+            self.stop_event.wait(self.poll_interval)
+
+    def _children(self):
+        try:
+            return self.process.children(recursive=True)
+        except psutil.Error:
+            return []
+
+    def track(self):
+        """记录当前由任务启动的子进程"""
+        for child in self._children():
+            if child.pid in self.baseline:
+                continue
+            try:
+                create_time = child.create_time()
+            except psutil.Error:
+                continue
+            with self.lock:
+                self.tracked[child.pid] = create_time
+
+    def leftovers(self):
+        """返回任务启动且仍在运行的进程"""
+        processes = {}
+        for child in self._children():
+            if child.pid not in self.baseline:
+                processes[child.pid] = child
+
+        # 父进程退出后被重新挂到init的浏览器进程
+        with self.lock:
+            tracked = list(self.tracked.items())
+        for pid, create_time in tracked:
+            if pid in processes:
+                continue
+            try:
+                process = psutil.Process(pid)
+                if process.create_time() == create_time:
+                    processes[pid] = process
+            except psutil.Error:
+                pass
+
+        return list(processes.values())
+
+    def reap(self):
+        """结束残留进程，返回被清理的进程数"""
+        processes = self.leftovers()
+        if not processes:
+            return 0
+
+        names = []
+        for process in processes:
+            try:
+                names.append(f"{process.name()}({process.pid})")
+                process.terminate()
+            except psutil.Error:
+                pass
+
+        gone, alive = psutil.wait_procs(processes, timeout=self.grace)
+        for process in alive:
+            try:
+                process.kill()
+            except psutil.Error:
+                pass
+        if alive:
+            psutil.wait_procs(alive, timeout=self.grace)
+
+        if self.on_reap:
+            self.on_reap(self.label, names)
+        return len(processes)
+
+
+def sample_process_resources(process=None):
+    """
+    采集进程资源使用情况
+    返回: {"rss_bytes", "open_fds", "threads", "children"}
+    """
+    process = process or psutil.Process()
+    with process.oneshot():
+        sample = {
+            "rss_bytes": process.memory_info().rss,
+            "threads": process.num_threads()
+        }
+        if hasattr(process, "num_fds"):
+            sample["open_fds"] = process.num_fds()
+        else:
+            # Windows没有文件描述符，使用句柄数代替
+            sample["open_fds"] = process.num_handles()
+    sample["children"] = len(process.children(recursive=True))
+    return sample
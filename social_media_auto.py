@@ -2,11 +2,22 @@ import time
 import random
 import os
 import json
+import csv
+import gzip
+import heapq
+import atexit
+import cProfile
+import pstats
+import tracemalloc
 import requests
 import urllib.request
 from datetime import datetime, timedelta
 import schedule
 import threading
+import psutil
+from process_supervisor import ProcessSupervisor, sample_process_resources
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import socket
 import socks
 from selenium import webdriver
@@ -127,9 +138,13 @@ def schedule_post(config, platforms=None, delay_hours=None):
         
         # 将发布任务添加到调度器
         schedule.every(delay).hours.do(
-            lambda p=platform: scheduled_post_task(p, config)
+            lambda p=platform: run_with_profiling("task", p, config, run_scheduled_task, p, config)
         )
     
+    # 启动运行指标导出和进程资源监控
+    start_metrics_exporter(config)
+    start_resource_monitor(config)
+    
     # 启动调度器线程
     scheduler_thread = threading.Thread(target=run_scheduler)
     scheduler_thread.daemon = True
@@ -144,12 +159,31 @@ def run_scheduler():
         schedule.run_pending()
         time.sleep(60)  # 每分钟检查一次待执行的任务
 
+def run_scheduled_task(platform, config):
+    """执行定时发布任务并记录任务计数和总耗时"""
+    labels = {"platform": platform}
+    metrics.inc("hqmw_tasks_total", labels)
+    
+    result = False
+    try:
+        # 任务结束后清理残留的Chrome/chromedriver进程
+        with ProcessSupervisor(platform, on_reap=report_reaped_processes):
+            with metrics.time_stage(platform, "total"):
+                result = scheduled_post_task(platform, config)
+        return result
+    finally:
+        if result:
+            metrics.inc("hqmw_tasks_succeeded_total", labels)
+        else:
+            metrics.inc("hqmw_tasks_failed_total", labels)
+
 def scheduled_post_task(platform, config):
     """实际执行定时发布任务"""
     log_activity(f"开始执行{platform}的定时发布任务", "INFO")
     
     # 选择账号
-    account = select_account(platform, config)
+    with metrics.time_stage(platform, "select_account"):
+        account = select_account(platform, config)
     if not account:
         log_activity(f"未找到{platform}可用账号", "WARNING")
         return False
@@ -160,22 +194,26 @@ def scheduled_post_task(platform, config):
     topic = select_random_topic(config)
     
     # 下载图片
-    image_path = download_image(topic)
+    with metrics.time_stage(platform, "download_image"):
+        image_path = download_image(topic)
     if not image_path:
         log_activity(f"无法下载图片，定时任务取消", "ERROR")
         return False
     
     # 生成文案
     length = "long" if platform in ["facebook", "vk"] else "short"
-    caption = generate_caption(platform, topic, length)
+    with metrics.time_stage(platform, "generate_caption"):
+        caption = generate_caption(platform, topic, length)
     
     # 初始化浏览器
+    driver = None
     try:
-        # 配置代理
-        setup_proxy()
-        
-        service = Service(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=chrome_options)
+        with metrics.time_stage(platform, "browser_init"):
+            # 配置代理
+            setup_proxy()
+            
+            service = Service(ChromeDriverManager().install())
+            driver = webdriver.Chrome(service=service, options=chrome_options)
         
         # 登录
         login_func = globals().get(f"login_{platform}")
@@ -184,7 +222,8 @@ def scheduled_post_task(platform, config):
             driver.quit()
             return False
         
-        login_result = login_func(username, password)
+        with metrics.time_stage(platform, "login"):
+            login_result = login_func(username, password)
         if not login_result:
             log_activity(f"{platform}账号{username}登录失败", "ERROR")
             driver.quit()
@@ -197,7 +236,8 @@ def scheduled_post_task(platform, config):
             driver.quit()
             return False
         
-        publish_result = publish_func(image_path, caption)
+        with metrics.time_stage(platform, "publish"):
+            publish_result = publish_func(image_path, caption)
         
         # 更新发布时间
         if publish_result:
@@ -216,12 +256,318 @@ def scheduled_post_task(platform, config):
     except Exception as e:
         log_activity(f"定时发布任务执行出错: {str(e)}", "ERROR")
         record_post_stats(platform, username, topic, "error")
-        try:
-            driver.quit()
-        except:
-            pass
+        if driver is not None:
+            try:
+                driver.quit()
+            except:
+                pass
         return False
 
+# ==== 进程资源监控 ====
+
+def report_reaped_processes(label, names):
+    """记录任务结束后被清理的残留进程"""
+    metrics.inc("hqmw_reaped_processes_total", {"platform": label}, len(names))
+    log_activity(f"{label}任务结束后清理了{len(names)}个残留进程: {', '.join(names)}", "WARNING")
+
+def get_resource_monitor_settings(config=None):
+    """获取资源监控设置（阈值为0表示不告警）"""
+    settings = {
+        "enabled": True,
+        "interval": 60,
+        "max_rss_mb": 1024,
+        "max_open_fds": 1024,
+        "max_threads": 100,
+        "max_children": 20
+    }
+    if config:
+        settings.update(config.get("resource_monitor", {}))
+    return settings
+
+def check_resource_alerts(sample, settings, active_alerts):
+    """
+    对比阈值，超限和恢复时各记录一次日志
+    active_alerts: 当前处于告警状态的指标集合（会被修改）
+    """
+    limits = {
+        "rss_bytes": (settings["max_rss_mb"] * 1024 * 1024, "内存占用", lambda v: f"{v / 1024 / 1024:.1f}MB"),
+        "open_fds": (settings["max_open_fds"], "打开的文件描述符", str),
+        "threads": (settings["max_threads"], "线程数", str),
+        "children": (settings["max_children"], "子进程数", str)
+    }
+    for name, (limit, description, fmt) in limits.items():
+        if not limit:
+            continue
+        value = sample[name]
+        if value > limit and name not in active_alerts:
+            active_alerts.add(name)
+            metrics.inc("hqmw_resource_alerts_total", {"resource": name})
+            log_activity(f"资源告警: {description} {fmt(value)} 超过阈值 {fmt(limit)}", "WARNING")
+        elif value <= limit and name in active_alerts:
+            active_alerts.discard(name)
+            log_activity(f"资源恢复正常: {description} {fmt(value)}", "INFO")
+
+def run_resource_monitor(settings):
+    """定期采集调度器进程资源的线程"""
+    process = psutil.Process()
+    active_alerts = set()
+    while True:
+        try:
+            sample = sample_process_resources(process)
+            metrics.set_gauge("hqmw_process_rss_bytes", sample["rss_bytes"])
+            metrics.set_gauge("hqmw_process_open_fds", sample["open_fds"])
+            metrics.set_gauge("hqmw_process_threads", sample["threads"])
+            metrics.set_gauge("hqmw_process_children", sample["children"])
+            check_resource_alerts(sample, settings, active_alerts)
+        except Exception as e:
+            log_activity(f"进程资源采集失败: {str(e)}", "ERROR")
+        time.sleep(settings["interval"])
+
+resource_monitor_started = False
+
+def start_resource_monitor(config=None):
+    """按配置启动资源监控线程，每个进程只启动一次"""
+    global resource_monitor_started
+    settings = get_resource_monitor_settings(config)
+    if resource_monitor_started or not settings["enabled"]:
+        return
+    resource_monitor_started = True
+    
+    settings["interval"] = max(1, int(settings["interval"]))
+    monitor_thread = threading.Thread(target=run_resource_monitor, args=(settings,))
+    monitor_thread.daemon = True
+    monitor_thread.start()
+    log_activity(f"进程资源监控已启动，采样间隔{settings['interval']}秒")
+
+# ==== 运行指标功能 ====
+
+class MetricsRegistry:
+    """
+    进程内运行指标（计数器、仪表、直方图），以Prometheus文本格式导出
+    导出时只读取内存中的数据，不会重新解析统计文件
+    """
+    DEFAULT_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.gauge_callbacks = {}
+        self.histograms = {}
+        self.help_texts = {}
+
+    @staticmethod
+    def _key(labels):
+        return tuple(sorted((labels or {}).items()))
+
+    def describe(self, name, help_text):
+        """设置指标说明"""
+        self.help_texts[name] = help_text
+
+    def inc(self, name, labels=None, value=1):
+        """计数器加value"""
+        with self.lock:
+            series = self.counters.setdefault(name, {})
+            key = self._key(labels)
+            series[key] = series.get(key, 0) + value
+
+    def set_gauge(self, name, value, labels=None):
+        """设置仪表的当前值"""
+        with self.lock:
+            self.gauges.setdefault(name, {})[self._key(labels)] = value
+
+    def register_gauge(self, name, func):
+        """注册在导出时计算的仪表，func返回数值或None"""
+        with self.lock:
+            self.gauge_callbacks[name] = func
+
+    def observe(self, name, value, labels=None, buckets=None):
+        """向直方图添加一个观测值"""
+        with self.lock:
+            series = self.histograms.setdefault(name, {})
+            key = self._key(labels)
+            if key not in series:
+                bucket_bounds = tuple(buckets or self.DEFAULT_BUCKETS)
+                series[key] = {
+                    "buckets": bucket_bounds,
+                    "counts": [0] * len(bucket_bounds),
+                    "sum": 0.0,
+                    "count": 0
+                }
+            histogram = series[key]
+            for i, bound in enumerate(histogram["buckets"]):
+                if value <= bound:
+                    histogram["counts"][i] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    @contextmanager
+    def time_stage(self, platform, stage):
+        """记录一个任务阶段的耗时（秒）"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(
+                "hqmw_stage_duration_seconds",
+                time.perf_counter() - start,
+                {"platform": platform, "stage": stage}
+            )
+
+    @staticmethod
+    def _format_labels(key, extra=None):
+        items = list(key) + list(extra or [])
+        if not items:
+            return ""
+        parts = []
+        for label, value in items:
+            value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+            parts.append(f'{label}="{value}"')
+        return "{" + ",".join(parts) + "}"
+
+    @staticmethod
+    def _format_value(value):
+        if value == float("inf"):
+            return "+Inf"
+        if isinstance(value, float) and value.is_integer():
+            return str(int(value))
+        return str(value)
+
+    def render(self):
+        """生成Prometheus文本格式的指标"""
+        callback_values = {}
+        for name, func in list(self.gauge_callbacks.items()):
+            try:
+                value = func()
+            except Exception:
+                value = None
+            if value is not None:
+                callback_values[name] = value
+
+        lines = []
+        with self.lock:
+            for name in sorted(self.counters):
+                if name in self.help_texts:
+                    lines.append(f"# HELP {name} {self.help_texts[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(self.counters[name].items()):
+                    lines.append(f"{name}{self._format_labels(key)} {self._format_value(value)}")
+
+            gauges = {name: dict(series) for name, series in self.gauges.items()}
+            for name, value in callback_values.items():
+                gauges.setdefault(name, {})[()] = value
+            for name in sorted(gauges):
+                if name in self.help_texts:
+                    lines.append(f"# HELP {name} {self.help_texts[name]}")
+                lines.append(f"# TYPE {name} gauge")
+                for key, value in sorted(gauges[name].items()):
+                    lines.append(f"{name}{self._format_labels(key)} {self._format_value(value)}")
+
+            for name in sorted(self.histograms):
+                if name in self.help_texts:
+                    lines.append(f"# HELP {name} {self.help_texts[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, histogram in sorted(self.histograms[name].items()):
+                    for bound, count in zip(histogram["buckets"], histogram["counts"]):
+                        labels = self._format_labels(key, [("le", self._format_value(float(bound)))])
+                        lines.append(f"{name}_bucket{labels} {count}")
+                    labels = self._format_labels(key, [("le", "+Inf")])
+                    lines.append(f"{name}_bucket{labels} {histogram['count']}")
+                    lines.append(f"{name}_sum{self._format_labels(key)} {histogram['sum']}")
+                    lines.append(f"{name}_count{self._format_labels(key)} {histogram['count']}")
+
+        return "\n".join(lines) + "\n"
+
+def next_job_timestamp():
+    """下一个待执行任务的时间戳（秒），没有任务时返回None"""
+    next_run = schedule.next_run()
+    return next_run.timestamp() if next_run else None
+
+# 全局指标注册表
+metrics = MetricsRegistry()
+metrics.describe("hqmw_tasks_total", "已执行的定时发布任务数")
+metrics.describe("hqmw_tasks_succeeded_total", "成功的定时发布任务数")
+metrics.describe("hqmw_tasks_failed_total", "失败的定时发布任务数")
+metrics.describe("hqmw_pending_jobs", "调度器中的待执行任务数")
+metrics.describe("hqmw_next_job_timestamp_seconds", "下一个任务的计划执行时间（Unix时间戳）")
+metrics.describe("hqmw_stage_duration_seconds", "定时发布任务各阶段耗时（秒）")
+metrics.describe("hqmw_reaped_processes_total", "任务结束后被清理的残留子进程数")
+metrics.describe("hqmw_resource_alerts_total", "进程资源超过告警阈值的次数")
+metrics.describe("hqmw_process_rss_bytes", "调度器进程常驻内存（字节）")
+metrics.describe("hqmw_process_open_fds", "调度器进程打开的文件描述符数")
+metrics.describe("hqmw_process_threads", "调度器进程线程数")
+metrics.describe("hqmw_process_children", "调度器进程的子进程数")
+metrics.register_gauge("hqmw_pending_jobs", lambda: len(schedule.get_jobs()))
+metrics.register_gauge("hqmw_next_job_timestamp_seconds", next_job_timestamp)
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """提供/metrics接口的HTTP处理器"""
+    def do_GET(self):
+        if self.path.split("?")[0] not in ["/", "/metrics"]:
+            self.send_error(404)
+            return
+        body = metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def write_metrics_textfile(path):
+    """原子地写入指标文本文件（适用于node_exporter的textfile收集器）"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(metrics.render())
+    os.replace(tmp_path, path)
+
+def run_metrics_textfile_writer(path, interval):
+    """定期写入指标文本文件的线程"""
+    while True:
+        try:
+            write_metrics_textfile(path)
+        except Exception as e:
+            log_activity(f"写入指标文件失败: {str(e)}", "ERROR")
+        time.sleep(interval)
+
+metrics_exporter_started = False
+
+def start_metrics_exporter(config=None):
+    """
+    按配置启动指标导出（HTTP接口和/或文本文件），每个进程只启动一次
+    config: 配置字典，使用其中的"metrics"设置
+    """
+    global metrics_exporter_started
+    if metrics_exporter_started:
+        return
+    metrics_exporter_started = True
+    
+    settings = {"host": "127.0.0.1", "port": 9108, "textfile": "", "interval": 60}
+    if config:
+        settings.update(config.get("metrics", {}))
+    
+    if settings["port"]:
+        try:
+            server = ThreadingHTTPServer((settings["host"], int(settings["port"])), MetricsHandler)
+            server_thread = threading.Thread(target=server.serve_forever)
+            server_thread.daemon = True
+            server_thread.start()
+            log_activity(f"运行指标接口已启动: http://{settings['host']}:{settings['port']}/metrics")
+        except Exception as e:
+            log_activity(f"运行指标接口启动失败: {str(e)}", "WARNING")
+    
+    if settings["textfile"]:
+        writer_thread = threading.Thread(
+            target=run_metrics_textfile_writer,
+            args=(settings["textfile"], max(1, int(settings["interval"])))
+        )
+        writer_thread.daemon = True
+        writer_thread.start()
+        log_activity(f"运行指标将定期写入: {settings['textfile']}")
+
 # ==== 数据统计功能 ====
 
 def record_post_stats(platform, username, topic, status):
@@ -234,6 +580,9 @@ def record_post_stats(platform, username, topic, status):
     """
     stats_file = os.path.join("stats", "post_stats.json")
     
+    # 追加逐条发布记录，供导出分析使用
+    append_post_history(platform, username, topic, status)
+    
     # 读取现有统计数据
     stats = {}
     if os.path.exists(stats_file):
@@ -341,6 +690,400 @@ def get_stats_summary():
     except Exception as e:
         return f"统计数据读取失败: {str(e)}"
 
+# ==== 发布历史导出 ====
+
+POST_HISTORY_FILE = os.path.join("stats", "post_history.jsonl")
+EXPORT_COLUMNS = ["timestamp", "platform", "username", "topic", "status", "source"]
+DICTIONARY_COLUMNS = ["platform", "username", "topic", "status", "source"]
+
+def append_post_history(platform, username, topic, status):
+    """以JSON Lines格式追加一条发布记录"""
+    record = {
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "platform": platform,
+        "username": username,
+        "topic": topic,
+        "status": status
+    }
+    try:
+        with open(POST_HISTORY_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    except Exception as e:
+        log_activity(f"写入发布记录失败: {str(e)}", "ERROR")
+
+def iter_post_history(history_file=POST_HISTORY_FILE):
+    """逐行读取定时发布记录"""
+    if not os.path.exists(history_file):
+        return
+    with open(history_file, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            record["source"] = "scheduled"
+            yield record
+
+def iter_session_records(logs_dir="logs"):
+    """逐个读取手动发布的会话文件，按时间顺序生成发布记录"""
+    if not os.path.exists(logs_dir):
+        return
+    session_files = sorted(
+        name for name in os.listdir(logs_dir)
+        if name.startswith("session_") and name.endswith(".json")
+    )
+    for name in session_files:
+        try:
+            with open(os.path.join(logs_dir, name), "r", encoding="utf-8") as f:
+                session = json.load(f)
+        except Exception:
+            continue
+        accounts = session.get("accounts", {})
+        for platform, result in session.get("publish_results", {}).items():
+            yield {
+                "timestamp": session.get("timestamp", ""),
+                "platform": platform,
+                "username": accounts.get(platform, ""),
+                "topic": session.get("topic", ""),
+                "status": "success" if result == "成功" else "failed",
+                "source": "manual"
+            }
+
+def export_post_history(output_dir=None, compresslevel=5):
+    """
+    将所有发布记录流式导出为按月分区的CSV-gz文件
+    platform/username/topic/status/source列使用字典编码（整数），
+    编码表保存在dictionaries.json中；内存占用只与字典大小有关
+    output_dir: 导出目录，默认为exports/posts_<时间戳>
+    返回: 导出摘要字典
+    """
+    if output_dir is None:
+        output_dir = os.path.join("exports", f"posts_{datetime.now().strftime('%Y%m%d%H%M%S')}")
+    os.makedirs(output_dir, exist_ok=True)
+
+    dictionaries = {column: {} for column in DICTIONARY_COLUMNS}
+    partitions = {}
+    current_month = None
+    current_file = None
+    writer = None
+
+    # 两个来源都按时间排序，归并后每次只需打开一个分区文件
+    records = heapq.merge(
+        iter_post_history(), iter_session_records(),
+        key=lambda record: record.get("timestamp", "")
+    )
+
+    try:
+        for record in records:
+            timestamp = record.get("timestamp", "")
+            month = timestamp[:7] if len(timestamp) >= 7 else "unknown"
+
+            if month != current_month:
+                if current_file:
+                    current_file.close()
+                path = os.path.join(output_dir, f"posts_{month}.csv.gz")
+                is_new = month not in partitions
+                # 乱序记录回到已写过的月份时以追加方式写入新的gzip成员
+                current_file = gzip.open(path, "wt" if is_new else "at", encoding="utf-8",
+                                         newline="", compresslevel=compresslevel)
+                writer = csv.writer(current_file)
+                if is_new:
+                    writer.writerow(EXPORT_COLUMNS)
+                    partitions[month] = 0
+                current_month = month
+
+            row = [timestamp]
+            for column in DICTIONARY_COLUMNS:
+                codes = dictionaries[column]
+                value = record.get(column, "")
+                code = codes.get(value)
+                if code is None:
+                    code = codes[value] = len(codes)
+                row.append(code)
+            writer.writerow(row)
+            partitions[month] += 1
+    finally:
+        if current_file:
+            current_file.close()
+
+    # 保存编码表（列表下标即编码）
+    with open(os.path.join(output_dir, "dictionaries.json"), "w", encoding="utf-8") as f:
+        json.dump({column: list(codes) for column, codes in dictionaries.items()},
+                  f, ensure_ascii=False, indent=2)
+
+    summary = {
+        "output_dir": output_dir,
+        "rows": sum(partitions.values()),
+        "partitions": {month: partitions[month] for month in sorted(partitions)}
+    }
+    with open(os.path.join(output_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+
+    log_activity(f"已导出{summary['rows']}条发布记录（{len(partitions)}个月份分区）至: {output_dir}")
+    return summary
+
+# ==== 性能分析功能 ====
+
+PROFILE_DIR = os.path.join("logs", "profiles")
+
+# 当前正在进行的性能分析会话（同一时间只允许一个，cProfile在Python 3.12+不支持并行分析）
+active_profile_session = None
+profile_session_lock = threading.Lock()
+
+def get_profiling_settings(config=None):
+    """
+    获取性能分析设置，环境变量优先于配置文件
+    HQMW_PROFILE=1 启用cProfile，HQMW_PROFILE_MEMORY=1 同时启用tracemalloc，
+    HQMW_PROFILE_KEEP 设置保留的分析文件数量
+    config: 配置字典
+    返回: 设置字典
+    """
+    settings = {"enabled": False, "memory": False, "keep": 20}
+    if config:
+        settings.update(config.get("profiling", {}))
+
+    enabled = os.environ.get("HQMW_PROFILE")
+    if enabled is not None:
+        settings["enabled"] = enabled.strip().lower() in ["1", "true", "yes", "on"]
+    memory = os.environ.get("HQMW_PROFILE_MEMORY")
+    if memory is not None:
+        settings["memory"] = memory.strip().lower() in ["1", "true", "yes", "on"]
+    keep = os.environ.get("HQMW_PROFILE_KEEP")
+    if keep:
+        settings["keep"] = keep
+
+    try:
+        settings["keep"] = int(settings["keep"])
+    except (TypeError, ValueError):
+        log_activity(f"无效的性能分析保留数量: {settings['keep']}，使用默认值20", "WARNING")
+        settings["keep"] = 20
+
+    return settings
+
+class ProfileSession:
+    """
+    一次性能分析会话：cProfile记录函数耗时，可选tracemalloc记录内存分配位置
+    label: 会话名称，如"task"或"cli_mode2"
+    platform: 平台名称，写入文件名
+    """
+    def __init__(self, label, platform="all", memory=False, keep=20):
+        self.label = label
+        self.platform = platform
+        self.memory = memory
+        self.keep = keep
+        self.profiler = None
+        self.started_tracemalloc = False
+
+    def start(self):
+        """启动分析，失败时抛出异常且不留下已启动的分析器"""
+        profiler = cProfile.Profile()
+        profiler.enable()
+        self.profiler = profiler
+        # 在cProfile成功启动后再启动tracemalloc，避免失败时残留
+        if self.memory:
+            try:
+                if tracemalloc.is_tracing():
+                    # 已在追踪时只重置峰值，使峰值反映本次会话
+                    tracemalloc.reset_peak()
+                else:
+                    tracemalloc.start(25)
+                    self.started_tracemalloc = True
+            except Exception:
+                profiler.disable()
+                self.profiler = None
+                raise
+        return self
+
+    def stop(self):
+        """停止分析并保存结果，可重复调用"""
+        if self.profiler is None:
+            return None
+        self.profiler.disable()
+
+        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+        base_path = os.path.join(PROFILE_DIR, f"{self.label}_{self.platform}_{timestamp}")
+
+        # 保存结果失败不能影响被分析的任务
+        try:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            self.profiler.dump_stats(base_path + ".prof")
+
+            if self.memory and tracemalloc.is_tracing():
+                # 峰值包含会话期间分配后又释放的内存，快照只包含结束时仍占用的内存
+                _, peak = tracemalloc.get_traced_memory()
+                snapshot = tracemalloc.take_snapshot().filter_traces([
+                    tracemalloc.Filter(False, cProfile.__file__),
+                    tracemalloc.Filter(False, tracemalloc.__file__)
+                ])
+                memory_info = {
+                    "peak_bytes": peak,
+                    "allocations": [
+                        {
+                            "site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                            "size": stat.size,
+                            "count": stat.count
+                        }
+                        for stat in snapshot.statistics("lineno")[:50]
+                    ]
+                }
+                with open(base_path + ".mem.json", "w", encoding="utf-8") as f:
+                    json.dump(memory_info, f, ensure_ascii=False, indent=2)
+
+            log_activity(f"性能分析结果已保存至: {base_path}.prof")
+            prune_profiles(self.keep)
+        except Exception as e:
+            log_activity(f"保存性能分析结果失败: {str(e)}", "ERROR")
+        finally:
+            self.profiler = None
+            if self.started_tracemalloc:
+                tracemalloc.stop()
+                self.started_tracemalloc = False
+
+        return base_path
+
+def list_profiles():
+    """
+    列出性能分析文件，按修改时间从新到旧排序
+    列目录后被其他进程删除的文件会被跳过
+    """
+    if not os.path.exists(PROFILE_DIR):
+        return []
+
+    profiles = []
+    for name in os.listdir(PROFILE_DIR):
+        if not name.endswith(".prof"):
+            continue
+        path = os.path.join(PROFILE_DIR, name)
+        try:
+            profiles.append((os.path.getmtime(path), path))
+        except OSError:
+            continue
+    profiles.sort(reverse=True)
+    return [path for _, path in profiles]
+
+def prune_profiles(keep):
+    """只保留最新的keep份性能分析结果"""
+    for path in list_profiles()[max(int(keep), 0):]:
+        for file_path in [path, path[:-len(".prof")] + ".mem.json"]:
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
+
+def start_profiling(label, config=None, platform="all"):
+    """
+    按设置启动性能分析
+    返回: ProfileSession对象，未启用时返回None
+    """
+    settings = get_profiling_settings(config)
+    if not settings["enabled"]:
+        return None
+
+    global active_profile_session
+    with profile_session_lock:
+        if active_profile_session is not None:
+            log_activity(f"已有性能分析会话正在进行({active_profile_session.label})，跳过: {label}/{platform}")
+            return None
+        try:
+            session = ProfileSession(label, platform, settings["memory"], settings["keep"]).start()
+        except Exception as e:
+            log_activity(f"性能分析启动失败，将不进行分析: {str(e)}", "WARNING")
+            return None
+        active_profile_session = session
+
+    log_activity(f"已启用性能分析: {label}/{platform}")
+    return session
+
+def stop_profiling(session):
+    """停止性能分析会话并释放占用，可重复调用"""
+    global active_profile_session
+    if session is None:
+        return None
+    try:
+        return session.stop()
+    except Exception as e:
+        log_activity(f"停止性能分析失败: {str(e)}", "ERROR")
+        return None
+    finally:
+        with profile_session_lock:
+            if active_profile_session is session:
+                active_profile_session = None
+
+def run_with_profiling(label, platform, config, func, *args):
+    """在性能分析下执行函数（未启用或启动失败时直接执行）"""
+    session = None
+    try:
+        session = start_profiling(label, config, platform)
+        return func(*args)
+    finally:
+        stop_profiling(session)
+
+def get_profile_summary(max_files=10, top=20):
+    """
+    汇总最近的性能分析结果
+    max_files: 汇总的最近文件数
+    top: 显示的函数和分配位置数量
+    """
+    profiles = list_profiles()[:max_files]
+    if not profiles:
+        return "暂无性能分析数据"
+
+    # 读取内存分析结果
+    memory_infos = {}
+    memory_errors = []
+    for path in profiles:
+        mem_file = path[:-len(".prof")] + ".mem.json"
+        if not os.path.exists(mem_file):
+            continue
+        try:
+            with open(mem_file, "r", encoding="utf-8") as f:
+                memory_info = json.load(f)
+            # 兼容旧格式（仅分配位置列表）
+            if isinstance(memory_info, list):
+                memory_info = {"peak_bytes": None, "allocations": memory_info}
+            memory_infos[path] = memory_info
+        except Exception as e:
+            memory_errors.append(f"读取内存分析文件失败: {mem_file} ({str(e)})")
+
+    lines = [f"性能分析摘要（最近{len(profiles)}份）:"]
+    for path in profiles:
+        peak = memory_infos.get(path, {}).get("peak_bytes")
+        if peak is not None:
+            lines.append(f"- {os.path.basename(path)} (内存峰值 {peak / 1024 / 1024:.1f} MiB)")
+        else:
+            lines.append(f"- {os.path.basename(path)}")
+
+    # 累计耗时最高的函数
+    try:
+        stats = pstats.Stats(*profiles)
+        functions = sorted(stats.stats.items(), key=lambda x: x[1][3], reverse=True)[:top]
+        lines.append(f"\n累计耗时最高的{len(functions)}个函数:")
+        for (filename, lineno, func_name), (cc, nc, tt, ct, callers) in functions:
+            location = f"{os.path.basename(filename)}:{lineno}" if lineno else filename
+            lines.append(f"- {ct:.3f}s 累计 | {tt:.3f}s 自身 | {nc}次调用 | {func_name} ({location})")
+    except Exception as e:
+        lines.append(f"\n读取性能分析文件失败: {str(e)}")
+
+    # 内存分配最多的位置（会话结束时仍占用的内存）
+    allocations = {}
+    for memory_info in memory_infos.values():
+        for item in memory_info.get("allocations", []):
+            site = allocations.setdefault(item["site"], {"size": 0, "count": 0})
+            site["size"] += item["size"]
+            site["count"] += item["count"]
+    for error in memory_errors:
+        lines.append(f"\n{error}")
+
+    if allocations:
+        sites = sorted(allocations.items(), key=lambda x: x[1]["size"], reverse=True)[:top]
+        lines.append(f"\n会话结束时占用内存最多的{len(sites)}个位置:")
+        for site, info in sites:
+            lines.append(f"- {info['size'] / 1024:.1f} KiB | {info['count']}个对象 | {site}")
+
+    return "\n".join(lines)
+
 # ===== 内容生成功能 =====
 
 # 自动生成文案
@@ -404,6 +1147,9 @@ def generate_caption(platform, topic, length="short"):
     log_activity(f"文案生成完成，长度：{len(caption)}字符")
     return caption
 
+# 图片来源地址，{keyword}会被替换为搜索关键词（可通过环境变量指向本地服务器，便于离线测试）
+IMAGE_SOURCE_URL = os.environ.get("HQMW_IMAGE_SOURCE_URL", "https://source.unsplash.com/featured/?{keyword}")
+
 # 下载图片
 def download_image(keyword, save_path=None):
     """
@@ -422,7 +1168,7 @@ def download_image(keyword, save_path=None):
     try:
         # 使用Unsplash API获取图片（免费，无需API密钥）
         search_keyword = keyword.replace(" ", "+")
-        url = f"https://source.unsplash.com/featured/?{search_keyword}"
+        url = IMAGE_SOURCE_URL.format(keyword=search_keyword)
         
         # 下载图片
         response = requests.get(url, stream=True)
@@ -976,7 +1722,26 @@ def load_config(config_file="config.json"):
                 "reddit": 12,
                 "okru": 36
             },
-            "proxy": ""  # 代理设置
+            "proxy": "",  # 代理设置
+            "profiling": {  # 性能分析设置（也可用环境变量HQMW_PROFILE开启）
+                "enabled": False,
+                "memory": False,
+                "keep": 20
+            },
+            "metrics": {  # 定时发布运行指标（port为0时关闭HTTP接口）
+                "host": "127.0.0.1",
+                "port": 9108,
+                "textfile": "",
+                "interval": 60
+            },
+            "resource_monitor": {  # 调度器进程资源监控（阈值为0表示不告警）
+                "enabled": True,
+                "interval": 60,
+                "max_rss_mb": 1024,
+                "max_open_fds": 1024,
+                "max_threads": 100,
+                "max_children": 20
+            }
         }
         
         # 创建配置文件
@@ -1226,8 +1991,10 @@ if __name__ == "__main__":
     print("3. 设置定时发布")
     print("4. 修改配置")
     print("5. 查看统计数据")
+    print("6. 查看性能分析摘要")
+    print("7. 导出发布历史")
     
-    choice = input("请输入选项编号(1-5): ").strip()
+    choice = input("请输入选项编号(1-7): ").strip()
     
     if choice == "1":
         # 添加/管理账号
@@ -1277,8 +2044,10 @@ if __name__ == "__main__":
         print("3. 设置定时发布")
         print("4. 修改配置")
         print("5. 查看统计数据")
+        print("6. 查看性能分析摘要")
+        print("7. 导出发布历史")
         
-        choice = input("请输入选项编号(1-5): ").strip()
+        choice = input("请输入选项编号(1-7): ").strip()
     
     if choice == "4":
         # 修改配置
@@ -1346,8 +2115,17 @@ if __name__ == "__main__":
         print("3. 设置定时发布")
         print("4. 修改配置 (刚才已完成)")
         print("5. 查看统计数据")
+        print("6. 查看性能分析摘要")
+        print("7. 导出发布历史")
         
-        choice = input("请输入选项编号(1-5): ").strip()
+        choice = input("请输入选项编号(1-7): ").strip()
+    
+    # 按设置对最终选择的模式进行性能分析，程序退出时保存结果
+    # 定时发布模式由每次定时任务单独分析，不启动整个进程的会话
+    if choice != "3":
+        profile_session = start_profiling(f"cli_mode{choice}", config)
+        if profile_session:
+            atexit.register(stop_profiling, profile_session)
     
     if choice == "2":
         try:
@@ -1414,6 +2192,7 @@ if __name__ == "__main__":
         # 依次登录选择的平台并发布
         login_results = {}
         publish_results = {}
+        used_accounts = {}
         
         for platform in platforms_to_use:
             # 选择账号
@@ -1423,6 +2202,7 @@ if __name__ == "__main__":
                 continue
             
             username, password = account
+            used_accounts[platform] = username
             log_activity(f"使用{platform}账号: {username}")
             
             # 登录
@@ -1467,6 +2247,7 @@ if __name__ == "__main__":
             "topic": topic,
             "image_path": image_path,
             "captions": captions,
+            "accounts": used_accounts,
             "login_results": {k: "成功" if v else "失败" for k, v in login_results.items()},
             "publish_results": {k: "成功" if v else "失败" for k, v in publish_results.items()}
         }
@@ -1596,4 +2377,19 @@ if __name__ == "__main__":
             else:
                 log_activity("暂无详细统计数据", "INFO")
     
+    elif choice == "6":
+        # 查看性能分析摘要
+        print("\n" + get_profile_summary() + "\n")
+    
+    elif choice == "7":
+        # 导出发布历史
+        try:
+            export_summary = export_post_history()
+            print(f"\n已导出{export_summary['rows']}条记录至: {export_summary['output_dir']}")
+            for month, rows in export_summary["partitions"].items():
+                print(f"- {month}: {rows}条")
+            print()
+        except Exception as e:
+            log_activity(f"导出发布历史失败: {str(e)}", "ERROR")
+    
     log_activity("程序已退出。") 
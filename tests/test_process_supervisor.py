@@ -0,0 +1,68 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+psutil = pytest.importorskip("psutil")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from process_supervisor import ProcessSupervisor, sample_process_resources  # noqa: E402
+
+# 模拟chromedriver：启动一个"Chrome"孙进程并输出其pid，随后自己退出
+ORPHANING_PARENT = (
+    "import subprocess, sys, time\n"
+    "child = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)'])\n"
+    "print(child.pid, flush=True)\n"
+    "time.sleep(1)\n"
+)
+
+
+def wait_until(condition, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_reaps_grandchild_orphaned_before_exit():
+    reaped = []
+    with ProcessSupervisor("test", grace=2, on_reap=lambda label, names: reaped.extend(names)):
+        parent = subprocess.Popen(
+            [sys.executable, "-c", ORPHANING_PARENT], stdout=subprocess.PIPE, text=True
+        )
+        orphan_pid = int(parent.stdout.readline())
+        parent.wait()
+        parent.stdout.close()
+
+        # 父进程退出后，孙进程已不再是本进程的后代
+        current_children = {child.pid for child in psutil.Process().children(recursive=True)}
+        assert orphan_pid not in current_children
+        assert psutil.pid_exists(orphan_pid)
+
+    assert wait_until(lambda: not psutil.pid_exists(orphan_pid)
+                      or psutil.Process(orphan_pid).status() == psutil.STATUS_ZOMBIE)
+    assert any(name.endswith(f"({orphan_pid})") for name in reaped)
+
+
+def test_leaves_processes_started_before_task():
+    existing = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+    try:
+        with ProcessSupervisor("test", grace=2):
+            pass
+        assert existing.poll() is None
+    finally:
+        existing.kill()
+        existing.wait()
+
+
+def test_sample_process_resources():
+    sample = sample_process_resources()
+    assert sample["rss_bytes"] > 0
+    assert sample["threads"] >= 1
+    assert sample["open_fds"] >= 0
+    assert sample["children"] >= 0